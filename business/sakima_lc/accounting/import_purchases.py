@@ -11,196 +11,361 @@ Usage:
 """
 
 import csv
+import functools
+import os
+import re
 import sys
+import fnmatch
+import operator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
 import argparse
 from pathlib import Path
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Dict, Optional
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Sequence, TextIO, Tuple
 import glob
 
-def parse_whatnot_purchase_date(date_str: str) -> Optional[str]:
-    """Convert Whatnot purchase datetime to hledger date format."""
-    if not date_str or date_str.strip() == '':
+# Parsing here is string slicing and Decimal construction, which Numba can only
+# run in object mode (no speedup, sometimes slower) - don't @njit these helpers.
+
+# Try multiple date formats
+_PURCHASE_DATE_FORMATS = [
+    "%b %d, %Y, %I:%M:%S %p",  # Nov 9, 2025, 7:27:37 PM
+    "%Y-%m-%d %H:%M:%S",        # 2025-11-09 19:27:37
+    "%m/%d/%Y",                 # 11/09/2025
+    "%Y-%m-%d",                 # 2025-11-09
+]
+
+# Exports repeat the same timestamps heavily; cache parsed results by raw string
+_DATE_CACHE: Dict[str, Optional[str]] = {}
+# Last format that parsed successfully - a single export almost always uses one
+_last_date_format = _PURCHASE_DATE_FORMATS[0]
+
+_MONTH_MAP = {
+    'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04', 'May': '05', 'Jun': '06',
+    'Jul': '07', 'Aug': '08', 'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12',
+}
+
+def _is_digits(text: str) -> bool:
+    """Check text is non-empty ASCII digits, the only digits the strptime formats here accept."""
+    return text.isascii() and text.isdigit()
+
+# "Nov 9, 2025, 7:27:37 PM" with ASCII digits and an in-range clock; anything
+# looser is left for strptime to judge
+_LONG_DATE = re.compile(
+    r'([A-Z][a-z]{2}) ([0-9]{1,2}), ([1-9][0-9]{3}), (?:1[0-2]|0?[1-9]):[0-5][0-9]:[0-5][0-9] [AP]M')
+
+def _slice_long_date(date_str: str) -> Optional[str]:
+    """Parse "Nov 9, 2025, 7:27:37 PM" with one regex match instead of strptime."""
+    match = _LONG_DATE.fullmatch(date_str)
+    if match is None or match[1] not in _MONTH_MAP:
+        return None
+    mon, day, year = match.groups()
+    try:
+        datetime(int(year), int(_MONTH_MAP[mon]), int(day))
+    except ValueError:
         return None
+    return f"{year}/{_MONTH_MAP[mon]}/{int(day):02d}"
 
-    # Try multiple date formats
-    formats = [
-        "%b %d, %Y, %I:%M:%S %p",  # Nov 9, 2025, 7:27:37 PM
-        "%Y-%m-%d %H:%M:%S",        # 2025-11-09 19:27:37
-        "%m/%d/%Y",                 # 11/09/2025
-        "%Y-%m-%d",                 # 2025-11-09
-    ]
+def _slice_iso_date(date_str: str) -> Optional[str]:
+    """Parse "2025-11-09" or "2025-11-09 19:27:37" by slicing, without strptime."""
+    if len(date_str) not in (10, 19) or date_str[4] != '-' or date_str[7] != '-':
+        return None
+    fields = [date_str[0:4], date_str[5:7], date_str[8:10]]
+    if len(date_str) == 19:
+        if date_str[10] != ' ' or date_str[13] != ':' or date_str[16] != ':':
+            return None
+        fields += [date_str[11:13], date_str[14:16], date_str[17:19]]
+    if not all(map(_is_digits, fields)) or date_str[0] == '0':
+        return None
+    try:
+        datetime(*map(int, fields))
+    except ValueError:
+        return None
+    return f"{fields[0]}/{fields[1]}/{fields[2]}"
+
+def _slice_us_date(date_str: str) -> Optional[str]:
+    """Parse "11/09/2025" by slicing, without strptime."""
+    if len(date_str) != 10 or date_str[2] != '/' or date_str[5] != '/':
+        return None
+    month, day, year = date_str[0:2], date_str[3:5], date_str[6:10]
+    if not (_is_digits(year) and _is_digits(month) and _is_digits(day)) or year[0] == '0':
+        return None
+    try:
+        datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
+    return f"{year}/{month}/{day}"
+
+def _parse_purchase_date(date_str: str) -> Optional[str]:
+    """Parse a purchase date, trying the last successful format first."""
+    global _last_date_format
+
+    # Dispatch on shape first so the common layouts never reach strptime
+    if len(date_str) > 4:
+        if date_str[4] == '-':
+            date = _slice_iso_date(date_str)
+        elif date_str[2:3] == '/':
+            date = _slice_us_date(date_str)
+        else:
+            date = _slice_long_date(date_str)
+        if date:
+            return date
 
-    for fmt in formats:
+    try:
+        return datetime.strptime(date_str, _last_date_format).strftime("%Y/%m/%d")
+    except ValueError:
+        pass
+
+    for fmt in _PURCHASE_DATE_FORMATS:
+        if fmt == _last_date_format:
+            continue
         try:
             dt = datetime.strptime(date_str, fmt)
-            return dt.strftime("%Y/%m/%d")
         except ValueError:
             continue
+        _last_date_format = fmt
+        return dt.strftime("%Y/%m/%d")
 
-    print(f"Warning: Could not parse date '{date_str}'", file=sys.stderr)
     return None
 
-def parse_amount(amount_str: str) -> Decimal:
-    """Parse amount string with various formats."""
-    if not amount_str or amount_str.strip() == '':
-        return Decimal('0')
-    # Remove $, commas, whitespace, and handle negative
-    clean = amount_str.replace('$', '').replace(',', '').strip()
-    return Decimal(clean)
+def parse_whatnot_purchase_date(date_str: str) -> Optional[str]:
+    """Convert Whatnot purchase datetime to hledger date format."""
+    if not date_str or date_str.strip() == '':
+        return None
 
-def detect_csv_format(file_path: Path) -> str:
-    """Detect the format of the purchase CSV file."""
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        header = f.readline().strip()
+    try:
+        date = _DATE_CACHE[date_str]
+    except KeyError:
+        date = _DATE_CACHE[date_str] = _parse_purchase_date(date_str)
+
+    if date is None:
+        print(f"Warning: Could not parse date '{date_str}'", file=sys.stderr)
+    return date
+
+_AMOUNT_DELETE = str.maketrans('', '', '$, \t\r\n')
+
+@functools.lru_cache(maxsize=None)
+def parse_cents(amount_str: str) -> int:
+    """Parse amount string with various formats into integer cents."""
+    clean = amount_str.translate(_AMOUNT_DELETE) if amount_str else ''
+    if not clean:
+        return 0
+    digits = clean[1:] if clean[0] in '+-' else clean
+    whole, _, frac = digits.partition('.')
+    if len(frac) <= 2 and (whole + frac).isdigit():
+        cents = int(whole or '0') * 100 + int(frac.ljust(2, '0'))
+        return -cents if clean[0] == '-' else cents
+    # Exponents and trailing zeros go through Decimal; fractions of a cent are refused, not rounded
+    scaled = Decimal(clean).scaleb(2)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"Amount has fractions of a cent: {amount_str!r}")
+    return int(scaled)
+
+def fmt_cents(cents: int) -> str:
+    """Format integer cents as a plain amount, e.g. -435 -> "-4.35"."""
+    whole, frac = divmod(abs(cents), 100)
+    return f"{'-' if cents < 0 else ''}{whole}.{frac:02d}"
+
+# Candidate columns for generic CSVs, in order of preference (lowercased)
+GENERIC_DATE_COLUMNS = ('date', 'purchase date', 'order date', 'transaction date')
+GENERIC_AMOUNT_COLUMNS = ('amount', 'total', 'cost', 'price')
+GENERIC_DESC_COLUMNS = ('description', 'item', 'title', 'product')
+
+def detect_csv_format(headers: List[str]) -> str:
+    """Detect the format of a purchase CSV from its header row."""
+    cols = {h.strip() for h in headers}
 
     # Whatnot buyer order history format
-    if 'Order Date' in header and 'Total' in header:
+    if {'Order Date', 'Total'} <= cols:
         return 'whatnot_orders'
 
     # Manual tracking format
-    elif 'Date' in header and 'Item' in header and 'Cost' in header:
+    elif {'Date', 'Item', 'Cost'} <= cols:
         return 'manual'
 
-    # Generic CSV with common columns
-    elif 'date' in header.lower() and 'amount' in header.lower():
+    # Generic CSV with common columns: some column mentioning a date and one an amount
+    lower_cols = [c.lower() for c in cols]
+    if any('date' in c for c in lower_cols) and any('amount' in c for c in lower_cols):
         return 'generic'
 
     return 'unknown'
 
-def import_whatnot_orders(file_path: Path) -> List[str]:
-    """Import from Whatnot buyer order history CSV."""
-    entries = []
+# Filename patterns picked up by --scan-downloads, matched in a single regex
+SCAN_PATTERNS = ["*purchase*.csv", "*order*.csv", "*inventory*.csv", "*COGS*.csv"]
+_SCAN_RE = re.compile('|'.join(fnmatch.translate(pattern) for pattern in SCAN_PATTERNS))
+
+# Posting prefixes with the amount column padding baked in; amounts are appended per row
+_POST_INVENTORY = "    Assets:Inventory                    $"
+
+# Balancing postings with the amount left for hledger to infer
+_BALANCE_CREDIT_CARD = "    Liabilities:CreditCard"
+
+def _column_picker(headers: List[str], columns: Sequence[Optional[str]]) -> Callable[[List[str]], Tuple[Optional[str], ...]]:
+    """Build a function that pulls the named columns out of a csv.reader row.
+
+    Columns missing from the header come back as None so callers can apply
+    their own defaults. Short rows are padded with empty strings.
+    """
+    width = len(headers)
+    # Missing columns index one past the end, where a None sentinel is appended
+    getter = operator.itemgetter(*[headers.index(c) if c in headers else width for c in columns])
+
+    def pick(row: List[str]) -> Tuple[Optional[str], ...]:
+        if len(row) != width:
+            row = (row + [''] * width)[:width]
+        row.append(None)
+        return getter(row)
+
+    return pick
+
+# Per-format column candidates (lowercased). For each field the first candidate
+# present in the header is used; optional fields may be missing entirely.
+PURCHASE_FORMATS: Dict[str, Dict] = {
+    'whatnot_orders': {
+        'date': ('order date',),
+        'amount': ('total',),
+        'item': ('item', 'title'),
+        'seller': ('seller',),
+        'order_id': ('order id',),
+        'seller_default': 'Unknown',
+        'seller_in_desc': True,
+        'label': 'purchases from Whatnot orders',
+    },
+    'manual': {
+        'date': ('date',),
+        'amount': ('cost',),
+        'item': ('item',),
+        'seller': ('seller', 'source'),
+        'notes': ('notes',),
+        'label': 'manual purchase records',
+    },
+    'generic': {
+        'date': GENERIC_DATE_COLUMNS,
+        'amount': GENERIC_AMOUNT_COLUMNS,
+        'item': GENERIC_DESC_COLUMNS,
+        'label': 'generic purchase records',
+    },
+}
+
+# Fields pulled from every row, in the order import_csv unpacks them
+_PURCHASE_FIELDS = ('date', 'amount', 'item', 'seller', 'order_id', 'notes')
+
+def import_csv(file_path: Path, headers: List[str], rows: Iterable[List[str]], spec: Dict) -> Iterator[str]:
+    """Import purchases from a CSV whose layout is described by a PURCHASE_FORMATS entry."""
     count = 0
 
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
+    # Lowercased name -> original header; the first of any duplicate wins
+    by_lower = {h.lower(): h for h in reversed(headers)}
+    columns = [
+        next((by_lower[col] for col in spec.get(field, ()) if col in by_lower), None)
+        for field in _PURCHASE_FIELDS
+    ]
+
+    if not columns[0] or not columns[1]:
+        print(f"Error: Could not find date and amount columns in {file_path}", file=sys.stderr)
+        return
 
-        for row in reader:
-            date = parse_whatnot_purchase_date(row.get('Order Date', ''))
-            if not date:
-                continue
+    pick = _column_picker(headers, columns)
+    seller_default = spec.get('seller_default', '')
+    seller_in_desc = spec.get('seller_in_desc', False)
 
-            # Extract purchase details
-            total = parse_amount(row.get('Total', '0'))
-            seller = row.get('Seller', 'Unknown')
-            item = row.get('Item', row.get('Title', 'Purchase'))
-            order_id = row.get('Order ID', '')
+    for row in rows:
+        purchase_date, amount, item, seller, order_id, notes = pick(row)
 
-            if total <= 0:
-                continue
+        date = parse_whatnot_purchase_date(purchase_date)
+        if not date:
+            continue
+
+        amount = parse_cents(amount)
+        if amount <= 0:
+            continue
 
-            desc = f"Purchase: {item[:50]}"
-            if seller != 'Unknown':
-                desc += f" from {seller}"
+        if seller is None:
+            seller = seller_default
 
-            entries.append(f"{date} * {desc}")
-            if order_id:
-                entries.append(f"    ; order_id: {order_id}")
-            entries.append(f"    ; seller: {seller}")
-            entries.append(f"    Assets:Inventory                    ${total}")
-            entries.append(f"    Liabilities:CreditCard")
-            entries.append("")
+        desc = f"Purchase: {item[:50]}" if item else "Purchase"
+        if seller_in_desc and seller and seller != seller_default:
+            desc += f" from {seller}"
 
-            count += 1
+        yield f"{date} * {desc}"
+        if order_id:
+            yield f"    ; order_id: {order_id}"
+        if seller:
+            yield f"    ; seller: {seller}"
+        if notes:
+            yield f"    ; notes: {notes[:80]}"
+        yield _POST_INVENTORY + fmt_cents(amount)
+        yield _BALANCE_CREDIT_CARD
+        yield ""
 
-    print(f"Imported {count} purchases from Whatnot orders")
-    return entries
+        count += 1
+
+    print(f"Imported {count} {spec['label']}")
+
+def _import_as(file_path: Path, csv_format: str) -> List[str]:
+    """Import a CSV already known to be in csv_format, returning its journal lines."""
+    with open(file_path, 'r', encoding='utf-8-sig', newline='', buffering=BUFFER_SIZE) as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
+        return list(import_csv(file_path, headers, reader, PURCHASE_FORMATS[csv_format]))
+
+def import_whatnot_orders(file_path: Path) -> List[str]:
+    """Import from Whatnot buyer order history CSV."""
+    return _import_as(file_path, 'whatnot_orders')
 
 def import_manual_purchases(file_path: Path) -> List[str]:
     """Import from manual purchase tracking CSV."""
-    entries = []
-    count = 0
+    return _import_as(file_path, 'manual')
 
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
+def import_generic_csv(file_path: Path) -> List[str]:
+    """Import from generic CSV with date and amount columns."""
+    return _import_as(file_path, 'generic')
 
-        for row in reader:
-            date = parse_whatnot_purchase_date(row.get('Date', ''))
-            if not date:
-                continue
+# CSVs and the output journal both go through 1 MiB buffers
+BUFFER_SIZE = 1 << 20
 
-            cost = parse_amount(row.get('Cost', '0'))
-            item = row.get('Item', 'Purchase')
-            seller = row.get('Seller', row.get('Source', ''))
-            notes = row.get('Notes', '')
+def write_lines(out: TextIO, lines: Iterable[str]) -> None:
+    """Write journal lines to an open file, one per line."""
+    for line in lines:
+        out.write(line)
+        out.write('\n')
 
-            if cost <= 0:
-                continue
+def join_lines(lines: List[str]) -> str:
+    """Join journal lines into one newline-terminated block, so it is written in a single call."""
+    return '\n'.join(lines) + '\n' if lines else ''
 
-            desc = f"Purchase: {item[:50]}"
+def import_file(file_path: Path) -> Iterator[str]:
+    """Detect the format of one purchase CSV and yield its journal lines."""
+    if not file_path.exists():
+        print(f"Error: File not found: {file_path}", file=sys.stderr)
+        return
 
-            entries.append(f"{date} * {desc}")
-            if seller:
-                entries.append(f"    ; seller: {seller}")
-            if notes:
-                entries.append(f"    ; notes: {notes[:80]}")
-            entries.append(f"    Assets:Inventory                    ${cost}")
-            entries.append(f"    Liabilities:CreditCard")
-            entries.append("")
+    print(f"\nProcessing: {file_path.name}")
 
-            count += 1
+    # Detection and import share one open file and one header read
+    with open(file_path, 'r', encoding='utf-8-sig', newline='', buffering=BUFFER_SIZE) as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
 
-    print(f"Imported {count} manual purchase records")
-    return entries
+        csv_format = detect_csv_format(headers)
+        print(f"Detected format: {csv_format}")
 
-def import_generic_csv(file_path: Path) -> List[str]:
-    """Import from generic CSV with date and amount columns."""
-    entries = []
-    count = 0
+        spec = PURCHASE_FORMATS.get(csv_format)
+        if spec is None:
+            print(f"Warning: Unknown CSV format, skipping {file_path.name}")
+            return
 
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        headers = [h.lower() for h in reader.fieldnames]
-
-        # Find date column
-        date_col = None
-        for col in ['date', 'purchase date', 'order date', 'transaction date']:
-            if col in headers:
-                date_col = reader.fieldnames[headers.index(col)]
-                break
-
-        # Find amount column
-        amount_col = None
-        for col in ['amount', 'total', 'cost', 'price']:
-            if col in headers:
-                amount_col = reader.fieldnames[headers.index(col)]
-                break
-
-        # Find description column
-        desc_col = None
-        for col in ['description', 'item', 'title', 'product']:
-            if col in headers:
-                desc_col = reader.fieldnames[headers.index(col)]
-                break
-
-        if not date_col or not amount_col:
-            print(f"Error: Could not find date and amount columns in {file_path}", file=sys.stderr)
-            return []
-
-        for row in reader:
-            date = parse_whatnot_purchase_date(row.get(date_col, ''))
-            if not date:
-                continue
-
-            amount = parse_amount(row.get(amount_col, '0'))
-            if amount <= 0:
-                continue
-
-            desc = "Purchase"
-            if desc_col and row.get(desc_col):
-                desc = f"Purchase: {row[desc_col][:50]}"
-
-            entries.append(f"{date} * {desc}")
-            entries.append(f"    Assets:Inventory                    ${amount}")
-            entries.append(f"    Liabilities:CreditCard")
-            entries.append("")
-
-            count += 1
-
-    print(f"Imported {count} generic purchase records")
-    return entries
+        yield from import_csv(file_path, headers, reader, spec)
+
+def import_file_captured(file_path: Path) -> Tuple[str, str, str]:
+    """Run import_file in a worker process, returning its stdout, stderr and journal text."""
+    stdout, stderr = StringIO(), StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        text = join_lines(list(import_file(file_path)))
+    return stdout.getvalue(), stderr.getvalue(), text
 
 def main():
     parser = argparse.ArgumentParser(description='Import Whatnot purchase history for COGS tracking')
@@ -211,37 +376,35 @@ def main():
     args = parser.parse_args()
 
     output_file = Path(args.output)
-    all_entries = []
+    header = []
 
     # Add header
-    all_entries.append("; Whatnot Purchase History (COGS)")
-    all_entries.append(f"; Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    all_entries.append("")
-    all_entries.append("; Account declarations")
-    all_entries.append("account Assets:Inventory")
-    all_entries.append("account Liabilities:CreditCard")
-    all_entries.append("account Equity:Opening")
-    all_entries.append("")
-    all_entries.append("; Opening balance")
-    all_entries.append("2025/07/01 * Opening Balance")
-    all_entries.append("    Assets:Inventory                    $0.00")
-    all_entries.append("    Equity:Opening                      $0.00")
-    all_entries.append("")
+    header.append("; Whatnot Purchase History (COGS)")
+    header.append(f"; Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    header.append("")
+    header.append("; Account declarations")
+    header.append("account Assets:Inventory")
+    header.append("account Liabilities:CreditCard")
+    header.append("account Equity:Opening")
+    header.append("")
+    header.append("; Opening balance")
+    header.append("2025/07/01 * Opening Balance")
+    header.append("    Assets:Inventory                    $0.00")
+    header.append("    Equity:Opening                      $0.00")
+    header.append("")
 
     files_to_import = []
 
     if args.scan_downloads:
         # Scan Downloads for purchase files
         download_dir = Path.home() / "Downloads"
-        patterns = [
-            "*purchase*.csv",
-            "*order*.csv",
-            "*inventory*.csv",
-            "*COGS*.csv"
-        ]
-
-        for pattern in patterns:
-            files_to_import.extend(download_dir.glob(pattern))
+        # One directory pass checks every pattern, so each file is listed once
+        if download_dir.is_dir():
+            with os.scandir(download_dir) as it:
+                files_to_import = sorted(
+                    Path(entry.path) for entry in it
+                    if not entry.name.startswith('.') and _SCAN_RE.match(entry.name) and entry.is_file()
+                )
 
         if not files_to_import:
             print("No purchase files found in Downloads")
@@ -254,33 +417,30 @@ def main():
         parser.print_help()
         return 1
 
-    # Import each file
-    for file_path in files_to_import:
-        if not file_path.exists():
-            print(f"Error: File not found: {file_path}", file=sys.stderr)
-            continue
-
-        print(f"\nProcessing: {file_path.name}")
-
-        csv_format = detect_csv_format(file_path)
-        print(f"Detected format: {csv_format}")
-
-        if csv_format == 'whatnot_orders':
-            entries = import_whatnot_orders(file_path)
-        elif csv_format == 'manual':
-            entries = import_manual_purchases(file_path)
-        elif csv_format == 'generic':
-            entries = import_generic_csv(file_path)
-        else:
-            print(f"Warning: Unknown CSV format, skipping {file_path.name}")
-            continue
-
-        all_entries.extend(entries)
-
-    # Write output
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(all_entries))
+    # Build the journal in a .tmp file and swap it in at the end; a failed
+    # import leaves the previous journal untouched
+    partial_file = output_file.with_name(output_file.name + '.tmp')
+    try:
+        with open(partial_file, 'w', encoding='utf-8', buffering=BUFFER_SIZE) as out:
+            write_lines(out, header)
+
+            if len(files_to_import) > 1:
+                # Files are independent, so import them in worker processes and
+                # write the results (and their console output) back in file order
+                workers = min(len(files_to_import), os.cpu_count() or 1)
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for stdout, stderr, text in executor.map(import_file_captured, files_to_import):
+                        sys.stdout.write(stdout)
+                        sys.stderr.write(stderr)
+                        out.write(text)
+            else:
+                for file_path in files_to_import:
+                    write_lines(out, import_file(file_path))
+    except BaseException:
+        partial_file.unlink(missing_ok=True)
+        raise
+    os.replace(partial_file, output_file)
 
     print(f"\n✓ Purchase journal created: {output_file}")
     print(f"\nView inventory: hledger -f {output_file} balance Assets:Inventory")
@@ -11,16 +11,50 @@ Use this for the most accurate account balance tracking.
 """
 
 import csv
+import functools
+import os
 import sys
+import operator
+import re
 from pathlib import Path
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple
 
-def parse_whatnot_ledger_date(date_str: str) -> Optional[str]:
-    """Convert Whatnot ledger datetime to hledger date format."""
-    if not date_str or date_str.strip() == '':
+# Date/amount parsing and entry building are string work: Numba would fall back
+# to object mode for them, so keep them plain Python rather than @njit.
+
+# Ledgers repeat the same timestamps heavily; cache parsed results by raw string
+_DATE_CACHE: Dict[str, Optional[str]] = {}
+
+_MONTH_MAP = {
+    'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04', 'May': '05', 'Jun': '06',
+    'Jul': '07', 'Aug': '08', 'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12',
+}
+
+# "Nov 9, 2025, 7:27:37 PM" or "Nov 9, 2025", restricted to ASCII digits and
+# in-range clock fields so anything strptime might read differently is left to it
+_LONG_DATE = re.compile(
+    r'([A-Z][a-z]{2}) ([0-9]{1,2}), ([1-9][0-9]{3})'
+    r'(?:, (?:1[0-2]|0?[1-9]):[0-5][0-9]:[0-5][0-9] [AP]M)?')
+
+def _slice_long_date(date_str: str) -> Optional[str]:
+    """Parse a ledger date with one regex match instead of strptime; None if it doesn't fit."""
+    match = _LONG_DATE.fullmatch(date_str)
+    if match is None or match[1] not in _MONTH_MAP:
+        return None
+    mon, day, year = match.groups()
+    try:
+        datetime(int(year), int(_MONTH_MAP[mon]), int(day))
+    except ValueError:
         return None
+    return f"{year}/{_MONTH_MAP[mon]}/{int(day):02d}"
+
+def _parse_ledger_date(date_str: str) -> Optional[str]:
+    """Parse a Whatnot ledger datetime without caching."""
+    date = _slice_long_date(date_str)
+    if date:
+        return date
     try:
         # Format: "Nov 9, 2025, 7:27:37 PM" -> "2025/11/09"
         dt = datetime.strptime(date_str, "%b %d, %Y, %I:%M:%S %p")
@@ -33,52 +67,111 @@ def parse_whatnot_ledger_date(date_str: str) -> Optional[str]:
         except ValueError:
             return None
 
-def parse_amount(amount_str: str) -> Decimal:
-    """Parse amount string with $ sign and commas."""
-    if not amount_str or amount_str.strip() == '':
-        return Decimal('0')
-    # Remove $, commas, and whitespace
-    clean = amount_str.replace('$', '').replace(',', '').strip()
-    return Decimal(clean)
-
-def create_ledger_entry(row: Dict[str, str]) -> List[str]:
-    """Create hledger journal entry from Whatnot ledger row."""
+def parse_whatnot_ledger_date(date_str: str) -> Optional[str]:
+    """Convert Whatnot ledger datetime to hledger date format."""
+    if not date_str or date_str.strip() == '':
+        return None
+    try:
+        return _DATE_CACHE[date_str]
+    except KeyError:
+        date = _DATE_CACHE[date_str] = _parse_ledger_date(date_str)
+        return date
+
+_AMOUNT_DELETE = str.maketrans('', '', '$, \t\r\n')
+
+# Ledger amounts repeat heavily, so results are cached by raw string
+@functools.lru_cache(maxsize=None)
+def parse_cents(amount_str: str) -> int:
+    """Parse amount string with $ sign and commas into integer cents."""
+    clean = amount_str.translate(_AMOUNT_DELETE) if amount_str else ''
+    if not clean:
+        return 0
+    digits = clean[1:] if clean[0] in '+-' else clean
+    whole, _, frac = digits.partition('.')
+    if len(frac) <= 2 and (whole + frac).isdigit():
+        cents = int(whole or '0') * 100 + int(frac.ljust(2, '0'))
+        return -cents if clean[0] == '-' else cents
+    scaled = Decimal(clean).scaleb(2)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"Amount has fractions of a cent: {amount_str!r}")
+    return int(scaled)
+
+def fmt_cents(cents: int) -> str:
+    """Format integer cents as a plain amount, e.g. -435 -> "-4.35"."""
+    whole, frac = divmod(abs(cents), 100)
+    return f"{'-' if cents < 0 else ''}{whole}.{frac:02d}"
+
+# Message keywords that decide how negative SALES/ADJUSTMENT rows are booked
+_MESSAGE_KEYWORDS = re.compile(r'giveaway|reversal|reversing|promotion', re.IGNORECASE)
+
+def _message_keywords(message: str) -> Set[str]:
+    """Return the classification keywords found in a ledger message, lowercased."""
+    return {keyword.lower() for keyword in _MESSAGE_KEYWORDS.findall(message)}
+
+def _truncate(text: str, limit: int, default: str) -> str:
+    """Return text cut to limit characters, or default when text is empty."""
+    if not text:
+        return default
+    return text if len(text) <= limit else text[:limit]
+
+# Posting prefixes, padded to the amount column
+_POST_GIVEAWAYS = "    Expenses:Giveaways                  $"
+_POST_PENDING = "    Assets:Whatnot:Pending              $"
+_POST_ADJUSTMENTS = "    Expenses:Adjustments                $"
+_POST_CHECKING = "    Assets:Checking                     $"
+_POST_SALES = "    Revenue:Sales                       $"
+_POST_MARKETING = "    Expenses:Marketing                  $"
+
+# Amount left for hledger to infer
+_BALANCE_SALES = "    Revenue:Sales"
+_BALANCE_OTHER = "    Revenue:Other"
+
+# Ledger columns used by create_ledger_entry, in the order rows are passed to it
+LEDGER_COLUMNS = ('Date', 'Amount', 'Transaction Type', 'Message', 'Listing ID', 'Order ID')
+
+# Columns no ledger row can be booked without; the rest read as '' when absent
+REQUIRED_LEDGER_COLUMNS = ('Date', 'Amount', 'Transaction Type')
+
+def create_ledger_entry(date: Optional[str], row: Tuple[str, ...]) -> Tuple[List[str], int, str]:
+    """Create hledger journal entry from a Whatnot ledger row (fields in LEDGER_COLUMNS order).
+
+    `date` is the row's already-parsed hledger date. Returns the entry lines
+    along with the amount in cents and transaction type, so callers can total
+    them without re-parsing the row.
+    """
     entries = []
+    _, amount_str, trans_type, message, listing_id, order_id = row
 
-    date = parse_whatnot_ledger_date(row['Date'])
     if not date:
-        return []  # Skip entries without valid dates
+        return [], 0, trans_type  # Skip entries without valid dates
 
-    amount = parse_amount(row['Amount'])
-    trans_type = row['Transaction Type']
-    message = row['Message'].replace('"', "'") if row['Message'] else ''
-    listing_id = row['Listing ID']
-    order_id = row['Order ID']
+    amount = parse_cents(amount_str)
+    message = message.replace('"', "'") if message else ''
 
     # Skip zero-amount transactions
     if amount == 0:
-        return []
+        return [], amount, trans_type
 
     if trans_type == 'SALES':
         if amount < 0:
             # Negative SALES = giveaway deduction
-            if 'giveaway' in message.lower():
+            if 'giveaway' in _message_keywords(message):
                 desc = f"Giveaway deduction"
                 entries.append(f"{date} * {desc}")
                 if order_id:
                     entries.append(f"    ; order_id: {order_id}")
                 if listing_id:
                     entries.append(f"    ; listing_id: {listing_id}")
-                entries.append(f"    Expenses:Giveaways                  ${-amount}")
-                entries.append(f"    Assets:Whatnot:Pending              ${amount}")
+                entries.append(_POST_GIVEAWAYS + fmt_cents(-amount))
+                entries.append(_POST_PENDING + fmt_cents(amount))
             else:
                 # Other negative sales (refunds, adjustments)
-                desc = message[:60] if message else "Sales adjustment"
+                desc = _truncate(message, 60, "Sales adjustment")
                 entries.append(f"{date} * {desc}")
                 if order_id:
                     entries.append(f"    ; order_id: {order_id}")
-                entries.append(f"    Expenses:Adjustments                ${-amount}")
-                entries.append(f"    Assets:Whatnot:Pending              ${amount}")
+                entries.append(_POST_ADJUSTMENTS + fmt_cents(-amount))
+                entries.append(_POST_PENDING + fmt_cents(amount))
         else:
             # Positive SALES = revenue
             # Extract item name from message
@@ -86,7 +179,7 @@ def create_ledger_entry(row: Dict[str, str]) -> List[str]:
                 item = message.replace("Earnings for selling a ", "")[:50]
                 desc = f"Sale: {item}"
             else:
-                desc = message[:60] if message else "Sale"
+                desc = _truncate(message, 60, "Sale")
 
             entries.append(f"{date} * {desc}")
             if order_id:
@@ -96,8 +189,8 @@ def create_ledger_entry(row: Dict[str, str]) -> List[str]:
 
             # Note: Ledger shows NET amount after fees, not gross
             # So we can't break out fees - just record net revenue
-            entries.append(f"    Assets:Whatnot:Pending              ${amount}")
-            entries.append(f"    Revenue:Sales")
+            entries.append(_POST_PENDING + fmt_cents(amount))
+            entries.append(_BALANCE_SALES)
 
         entries.append("")
 
@@ -110,13 +203,13 @@ def create_ledger_entry(row: Dict[str, str]) -> List[str]:
         entries.append(f"{date} * {desc}")
         entries.append(f"    ; {message[:80]}")
         # Amount is negative, so we negate it for the checking account (positive cash in)
-        entries.append(f"    Assets:Checking                     ${-amount}")
-        entries.append(f"    Assets:Whatnot:Pending              ${amount}")
+        entries.append(_POST_CHECKING + fmt_cents(-amount))
+        entries.append(_POST_PENDING + fmt_cents(amount))
         entries.append("")
 
     elif trans_type == 'ADJUSTMENT':
         # Various adjustments (show promotions, reversals, etc)
-        desc = message[:60] if message else "Account adjustment"
+        desc = _truncate(message, 60, "Account adjustment")
 
         entries.append(f"{date} * {desc}")
         if listing_id:
@@ -126,22 +219,23 @@ def create_ledger_entry(row: Dict[str, str]) -> List[str]:
 
         if amount < 0:
             # Negative adjustment (expense)
-            if 'reversal' in message.lower() or 'reversing' in message.lower():
+            keywords = _message_keywords(message)
+            if 'reversal' in keywords or 'reversing' in keywords:
                 # Reversal of previous sale
-                entries.append(f"    Revenue:Sales                       ${amount}")
-                entries.append(f"    Assets:Whatnot:Pending              ${-amount}")
-            elif 'promotion' in message.lower():
+                entries.append(_POST_SALES + fmt_cents(amount))
+                entries.append(_POST_PENDING + fmt_cents(-amount))
+            elif 'promotion' in keywords:
                 # Marketing expense
-                entries.append(f"    Expenses:Marketing                  ${-amount}")
-                entries.append(f"    Assets:Whatnot:Pending              ${amount}")
+                entries.append(_POST_MARKETING + fmt_cents(-amount))
+                entries.append(_POST_PENDING + fmt_cents(amount))
             else:
                 # Other adjustment
-                entries.append(f"    Expenses:Adjustments                ${-amount}")
-                entries.append(f"    Assets:Whatnot:Pending              ${amount}")
+                entries.append(_POST_ADJUSTMENTS + fmt_cents(-amount))
+                entries.append(_POST_PENDING + fmt_cents(amount))
         else:
             # Positive adjustment (income)
-            entries.append(f"    Assets:Whatnot:Pending              ${amount}")
-            entries.append(f"    Revenue:Other")
+            entries.append(_POST_PENDING + fmt_cents(amount))
+            entries.append(_BALANCE_OTHER)
 
         entries.append("")
 
@@ -149,11 +243,15 @@ def create_ledger_entry(row: Dict[str, str]) -> List[str]:
         # Unknown transaction type
         desc = f"{trans_type}: {message[:50]}"
         entries.append(f"{date} * {desc}")
-        entries.append(f"    Assets:Whatnot:Pending              ${amount}")
-        entries.append(f"    Revenue:Other")
+        entries.append(_POST_PENDING + fmt_cents(amount))
+        entries.append(_BALANCE_OTHER)
         entries.append("")
 
-    return entries
+    return entries, amount, trans_type
+
+def join_lines(lines: List[str]) -> str:
+    """Join journal lines into one newline-terminated string."""
+    return '\n'.join(lines) + '\n' if lines else ''
 
 def main():
     ledger_file = Path("/Users/benfife/Downloads/0e2b8bd2-573c-4405-bd98-0dc8a2dd015a.csv")
@@ -165,70 +263,90 @@ def main():
 
     print(f"Processing ledger file: {ledger_file.name}")
 
-    all_entries = []
+    header = []
     transaction_count = 0
-    total_sales = Decimal('0')
-    total_payouts = Decimal('0')
-    total_adjustments = Decimal('0')
+    total_sales = 0
+    total_payouts = 0
+    total_adjustments = 0
 
     # Add header
-    all_entries.append("; Whatnot Transaction Ledger Import")
-    all_entries.append(f"; Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    all_entries.append(f"; Source: {ledger_file.name}")
-    all_entries.append("")
-    all_entries.append("; Account declarations")
-    all_entries.append("account Assets:Whatnot:Pending")
-    all_entries.append("account Assets:Checking")
-    all_entries.append("account Revenue:Sales")
-    all_entries.append("account Revenue:Other")
-    all_entries.append("account Expenses:Giveaways")
-    all_entries.append("account Expenses:Marketing")
-    all_entries.append("account Expenses:Adjustments")
-    all_entries.append("account Equity:Opening")
-    all_entries.append("")
+    header.append("; Whatnot Transaction Ledger Import")
+    header.append(f"; Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    header.append(f"; Source: {ledger_file.name}")
+    header.append("")
+    header.append("; Account declarations")
+    header.append("account Assets:Whatnot:Pending")
+    header.append("account Assets:Checking")
+    header.append("account Revenue:Sales")
+    header.append("account Revenue:Other")
+    header.append("account Expenses:Giveaways")
+    header.append("account Expenses:Marketing")
+    header.append("account Expenses:Adjustments")
+    header.append("account Equity:Opening")
+    header.append("")
 
     # Determine opening balance date (earliest transaction)
-    with open(ledger_file, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    with open(ledger_file, 'r', encoding='utf-8-sig', newline='', buffering=1 << 20) as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
+        if not headers:
+            print(f"Ledger file has no header row: {ledger_file}")
+            return 1
+        missing = [c for c in REQUIRED_LEDGER_COLUMNS if c not in headers]
+        if missing:
+            print(f"Ledger file is missing required column(s): {', '.join(missing)}")
+            return 1
+        width = len(headers)
+        # Missing optional columns read the '' appended past the last real column
+        pick = operator.itemgetter(*[headers.index(c) if c in headers else width for c in LEDGER_COLUMNS])
+        # Rows are padded or trimmed to the header width so every column lookup succeeds
+        rows = [pick((row + [''] * width)[:width] + [''] if len(row) != width else row + [''])
+                for row in reader]
+
+    # Parse every date once, up front
+    parsed_rows = [(parse_whatnot_ledger_date(row[0]), row) for row in rows]
 
     # Get earliest date
-    dates = [parse_whatnot_ledger_date(row['Date']) for row in rows if parse_whatnot_ledger_date(row['Date'])]
+    dates = [date for date, _ in parsed_rows if date]
     if dates:
         earliest_date = min(dates)
-        all_entries.append(f"; Opening balance (day before first transaction)")
-        all_entries.append(f"{earliest_date} * Opening Balance")
-        all_entries.append("    Assets:Whatnot:Pending              $0.00")
-        all_entries.append("    Equity:Opening                      $0.00")
-        all_entries.append("")
-
-    # Process transactions (reverse chronological in file, so reverse it)
-    for row in reversed(rows):
-        entries = create_ledger_entry(row)
-        if entries:
-            all_entries.extend(entries)
-            transaction_count += 1
-
-            # Track totals for summary
-            amount = parse_amount(row['Amount'])
-            trans_type = row['Transaction Type']
-            if trans_type == 'SALES' and amount > 0:
-                total_sales += amount
-            elif trans_type == 'PAYOUT':
-                total_payouts += amount
-            elif trans_type == 'ADJUSTMENT':
-                total_adjustments += amount
-
-    # Write journal file
+        header.append(f"; Opening balance (day before first transaction)")
+        header.append(f"{earliest_date} * Opening Balance")
+        header.append("    Assets:Whatnot:Pending              $0.00")
+        header.append("    Equity:Opening                      $0.00")
+        header.append("")
+
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(all_entries))
+    # Write a .tmp file first so an error mid-ledger keeps the old journal
+    partial_file = output_file.with_name(output_file.name + '.tmp')
+    try:
+        with open(partial_file, 'w', encoding='utf-8', buffering=1 << 20) as out:
+            out.write(join_lines(header))
+
+            # Process transactions (reverse chronological in file, so reverse it)
+            for date, row in reversed(parsed_rows):
+                entries, amount, trans_type = create_ledger_entry(date, row)
+                if entries:
+                    out.write(join_lines(entries))
+                    transaction_count += 1
+
+                    # Track totals for summary
+                    if trans_type == 'SALES' and amount > 0:
+                        total_sales += amount
+                    elif trans_type == 'PAYOUT':
+                        total_payouts += amount
+                    elif trans_type == 'ADJUSTMENT':
+                        total_adjustments += amount
+    except BaseException:
+        partial_file.unlink(missing_ok=True)
+        raise
+    os.replace(partial_file, output_file)
 
     print(f"\nImport complete!")
     print(f"Transactions imported: {transaction_count:,}")
-    print(f"Total sales revenue: ${total_sales:,.2f}")
-    print(f"Total payouts: ${total_payouts:,.2f}")
-    print(f"Total adjustments: ${total_adjustments:,.2f}")
+    print(f"Total sales revenue: ${Decimal(total_sales).scaleb(-2):,.2f}")
+    print(f"Total payouts: ${Decimal(total_payouts).scaleb(-2):,.2f}")
+    print(f"Total adjustments: ${Decimal(total_adjustments).scaleb(-2):,.2f}")
     print(f"Journal file: {output_file}")
     print(f"\nVerify with: hledger -f {output_file} balance")
     print(f"View income: hledger -f {output_file} incomestatement")
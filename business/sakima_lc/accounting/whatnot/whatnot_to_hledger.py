@@ -5,17 +5,39 @@ Converts Whatnot transaction data into double-entry bookkeeping format.
 """
 
 import csv
+import functools
+import os
 import sys
+import operator
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 import glob
 
-def parse_whatnot_date(date_str: str) -> Optional[str]:
-    """Convert Whatnot datetime to hledger date format."""
-    if not date_str or date_str.strip() == '':
-        return None
+# Not a Numba candidate: these parsers are str/Decimal code that @njit could only
+# compile in object mode, which is no faster than the interpreter.
+
+# Earnings exports repeat the same timestamps heavily; cache parsed results by raw string
+_DATE_CACHE: Dict[str, Optional[str]] = {}
+
+def _parse_date(date_str: str) -> Optional[str]:
+    """Parse a Whatnot datetime without caching."""
+    # Fast path: slice the fixed-width "YYYY-MM-DD HH:MM:SS" layout directly,
+    # checking every field so nothing strptime would reject gets through
+    if (len(date_str) == 19 and date_str[4] == '-' and date_str[7] == '-'
+            and date_str[10] == ' ' and date_str[13] == ':' and date_str[16] == ':'):
+        fields = (date_str[0:4], date_str[5:7], date_str[8:10],
+                  date_str[11:13], date_str[14:16], date_str[17:19])
+        # strptime only takes ASCII digits here, and strftime leaves years below 1000 unpadded
+        if date_str.isascii() and all(field.isdigit() for field in fields) and date_str[0] != '0':
+            try:
+                datetime(*map(int, fields))
+            except ValueError:
+                pass
+            else:
+                return f"{fields[0]}/{fields[1]}/{fields[2]}"
     try:
         # Format: "2025-10-28 06:06:52" -> "2025/10/28"
         dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
@@ -23,50 +45,104 @@ def parse_whatnot_date(date_str: str) -> Optional[str]:
     except ValueError:
         return None
 
-def format_amount(amount: str) -> Decimal:
-    """Convert string amount to Decimal."""
-    if not amount or amount.strip() == '':
-        return Decimal('0')
-    return Decimal(amount)
+def parse_whatnot_date(date_str: str) -> Optional[str]:
+    """Convert Whatnot datetime to hledger date format."""
+    if not date_str or date_str.strip() == '':
+        return None
+    try:
+        return _DATE_CACHE[date_str]
+    except KeyError:
+        date = _DATE_CACHE[date_str] = _parse_date(date_str)
+        return date
+
+_AMOUNT_DELETE = str.maketrans('', '', '$, \t\r\n')
+
+# Money is carried as integer cents; the same few amounts recur, so parses are cached
+@functools.lru_cache(maxsize=None)
+def parse_cents(amount_str: str) -> int:
+    """Convert string amount to integer cents."""
+    clean = amount_str.translate(_AMOUNT_DELETE) if amount_str else ''
+    if not clean:
+        return 0
+    digits = clean[1:] if clean[0] in '+-' else clean
+    whole, _, frac = digits.partition('.')
+    if len(frac) <= 2 and (whole + frac).isdigit():
+        cents = int(whole or '0') * 100 + int(frac.ljust(2, '0'))
+        return -cents if clean[0] == '-' else cents
+    scaled = Decimal(clean).scaleb(2)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"Amount has fractions of a cent: {amount_str!r}")
+    return int(scaled)
 
-def create_journal_entry(row: Dict[str, str]) -> List[str]:
-    """Create hledger journal entry from Whatnot CSV row."""
+def fmt_cents(cents: int) -> str:
+    """Format integer cents as a plain amount, e.g. -435 -> "-4.35"."""
+    whole, frac = divmod(abs(cents), 100)
+    return f"{'-' if cents < 0 else ''}{whole}.{frac:02d}"
+
+# Posting prefixes, padded to the amount column
+_POST_PENDING = "    Assets:Whatnot:Pending              $"
+_POST_TIPS = "    Revenue:Tips                       $"
+_POST_GIVEAWAYS = "    Expenses:Giveaways                  $"
+_POST_FEES = "    Expenses:Fees                        $"
+_POST_CHECKING = "    Assets:Checking                     $"
+_POST_SALES = "    Revenue:Sales                       $"
+_POST_OTHER = "    Revenue:Other                       $"
+
+# Amount left for hledger to infer
+_BALANCE_SALES = "    Revenue:Sales"
+
+# Earnings columns used by create_journal_entry, in the order rows are passed to it
+EARNINGS_COLUMNS = (
+    'TRANSACTION_COMPLETED_AT_UTC', 'ORDER_PLACED_AT_UTC', 'TRANSACTION_TYPE',
+    'TRANSACTION_AMOUNT', 'TRANSACTION_MESSAGE', 'LISTING_TITLE', 'BUYER_NAME',
+    'ORDER_ID', 'SKU', 'LEDGER_TRANSACTION_ID', 'BUYER_PAID', 'COMMISSION_FEE',
+    'PAYMENT_PROCESSING_FEE', 'SHIPPING_FEE',
+)
+
+# Columns no earnings row can be booked without; the rest read as '' when absent
+REQUIRED_EARNINGS_COLUMNS = (
+    'TRANSACTION_COMPLETED_AT_UTC', 'ORDER_PLACED_AT_UTC', 'TRANSACTION_TYPE', 'TRANSACTION_AMOUNT',
+)
+
+def create_journal_entry(row: Tuple[str, ...]) -> List[str]:
+    """Create hledger journal entry from a Whatnot CSV row (fields in EARNINGS_COLUMNS order)."""
     entries = []
+    (completed_at, placed_at, trans_type, amount_str, trans_message, listing_title,
+     buyer_name, order_id, sku, transaction_id, buyer_paid_str, commission_str,
+     processing_str, shipping_str) = row
 
     # Use transaction completed date, fallback to order placed date
-    date_str = row['TRANSACTION_COMPLETED_AT_UTC'] or row['ORDER_PLACED_AT_UTC']
+    date_str = completed_at or placed_at
     date = parse_whatnot_date(date_str)
     if not date:
         return []  # Skip entries without dates
 
-    trans_type = row['TRANSACTION_TYPE']
-    trans_amount = format_amount(row['TRANSACTION_AMOUNT'])
+    trans_amount = parse_cents(amount_str)
 
     # Skip zero-amount transactions
     if trans_amount == 0:
         return []
 
     # Create transaction description
-    listing_title = row['LISTING_TITLE'].replace('"', "'") if row['LISTING_TITLE'] else 'Unknown'
-    buyer = row['BUYER_NAME'] or 'Unknown'
-    order_id = row['ORDER_ID']
+    listing_title = listing_title.replace('"', "'") if listing_title else 'Unknown'
+    buyer = buyer_name or 'Unknown'
 
     if trans_type == 'TIP':
         # Tips are pure revenue
         desc = f"Tip from {buyer}"
         entries.append(f"{date} * {desc}")
-        if row['LEDGER_TRANSACTION_ID']:
-            entries.append(f"    ; transaction_id: {row['LEDGER_TRANSACTION_ID']}")
-        entries.append(f"    Assets:Whatnot:Pending              ${trans_amount}")
-        entries.append(f"    Revenue:Tips                       ${-trans_amount}")
+        if transaction_id:
+            entries.append(f"    ; transaction_id: {transaction_id}")
+        entries.append(_POST_PENDING + fmt_cents(trans_amount))
+        entries.append(_POST_TIPS + fmt_cents(-trans_amount))
         entries.append("")
 
     elif trans_type == 'ORDER_EARNINGS':
         # Sales with fees broken out
-        buyer_paid = format_amount(row['BUYER_PAID'])
-        commission = format_amount(row['COMMISSION_FEE'])
-        processing = format_amount(row['PAYMENT_PROCESSING_FEE'])
-        shipping = format_amount(row['SHIPPING_FEE'])
+        buyer_paid = parse_cents(buyer_paid_str)
+        commission = parse_cents(commission_str)
+        processing = parse_cents(processing_str)
+        shipping = parse_cents(shipping_str)
 
         if trans_amount < 0:
             # Giveaway cost (expense)
@@ -74,44 +150,44 @@ def create_journal_entry(row: Dict[str, str]) -> List[str]:
             entries.append(f"{date} * {desc}")
             if order_id:
                 entries.append(f"    ; order_id: {order_id}")
-            entries.append(f"    Expenses:Giveaways                  ${-trans_amount}")
-            entries.append(f"    Assets:Whatnot:Pending              ${trans_amount}")
+            entries.append(_POST_GIVEAWAYS + fmt_cents(-trans_amount))
+            entries.append(_POST_PENDING + fmt_cents(trans_amount))
             entries.append("")
         else:
             # Regular sale
             # Calculate total fees (difference between buyer paid and net received)
-            total_fees = buyer_paid - trans_amount if buyer_paid > 0 else Decimal('0')
+            total_fees = buyer_paid - trans_amount if buyer_paid > 0 else 0
 
             desc = f"Sale: {listing_title[:40]} - {buyer}"
             entries.append(f"{date} * {desc}")
             if order_id:
                 entries.append(f"    ; order_id: {order_id}")
-            if row['SKU']:
-                entries.append(f"    ; sku: {row['SKU']}")
+            if sku:
+                entries.append(f"    ; sku: {sku}")
             if commission > 0:
-                entries.append(f"    ; commission_fee: ${commission}")
+                entries.append(f"    ; commission_fee: ${fmt_cents(commission)}")
             if processing > 0:
-                entries.append(f"    ; processing_fee: ${processing}")
+                entries.append(f"    ; processing_fee: ${fmt_cents(processing)}")
 
             # Simplified accounting: Net amount received and total revenue
             if buyer_paid > 0:
-                entries.append(f"    Assets:Whatnot:Pending              ${trans_amount}")
-                entries.append(f"    Expenses:Fees                        ${total_fees}")
-                entries.append(f"    Revenue:Sales")
+                entries.append(_POST_PENDING + fmt_cents(trans_amount))
+                entries.append(_POST_FEES + fmt_cents(total_fees))
+                entries.append(_BALANCE_SALES)
             else:
                 # If no buyer_paid amount, just record net
-                entries.append(f"    Assets:Whatnot:Pending              ${trans_amount}")
-                entries.append(f"    Revenue:Sales")
+                entries.append(_POST_PENDING + fmt_cents(trans_amount))
+                entries.append(_BALANCE_SALES)
             entries.append("")
 
     elif trans_type == 'PAYOUT':
         # Payout to bank account
         desc = "Payout to bank"
         entries.append(f"{date} * {desc}")
-        if row['LEDGER_TRANSACTION_ID']:
-            entries.append(f"    ; transaction_id: {row['LEDGER_TRANSACTION_ID']}")
-        entries.append(f"    Assets:Checking                     ${trans_amount}")
-        entries.append(f"    Assets:Whatnot:Pending              ${-trans_amount}")
+        if transaction_id:
+            entries.append(f"    ; transaction_id: {transaction_id}")
+        entries.append(_POST_CHECKING + fmt_cents(trans_amount))
+        entries.append(_POST_PENDING + fmt_cents(-trans_amount))
         entries.append("")
 
     elif trans_type == 'REFUND':
@@ -120,27 +196,72 @@ def create_journal_entry(row: Dict[str, str]) -> List[str]:
         entries.append(f"{date} * {desc}")
         if order_id:
             entries.append(f"    ; order_id: {order_id}")
-        entries.append(f"    Assets:Whatnot:Pending              ${trans_amount}")
-        entries.append(f"    Revenue:Sales                       ${-trans_amount}")
+        entries.append(_POST_PENDING + fmt_cents(trans_amount))
+        entries.append(_POST_SALES + fmt_cents(-trans_amount))
         entries.append("")
     else:
         # Other transaction types
-        desc = f"{trans_type}: {row['TRANSACTION_MESSAGE'][:50]}"
+        desc = f"{trans_type}: {trans_message[:50]}"
         entries.append(f"{date} * {desc}")
-        if row['LEDGER_TRANSACTION_ID']:
-            entries.append(f"    ; transaction_id: {row['LEDGER_TRANSACTION_ID']}")
-        entries.append(f"    Assets:Whatnot:Pending              ${trans_amount}")
-        entries.append(f"    Revenue:Other                       ${-trans_amount}")
+        if transaction_id:
+            entries.append(f"    ; transaction_id: {transaction_id}")
+        entries.append(_POST_PENDING + fmt_cents(trans_amount))
+        entries.append(_POST_OTHER + fmt_cents(-trans_amount))
         entries.append("")
 
     return entries
 
+# Column pickers keyed by header row; exports normally share one schema
+_PICKERS: Dict[Tuple[str, ...], Callable] = {}
+
+def convert_file(csv_file: Path) -> Tuple[str, int]:
+    """Convert one earnings CSV into journal text; returns (text, transaction count)."""
+    lines = []
+    count = 0
+
+    with open(csv_file, 'r', encoding='utf-8', newline='', buffering=1 << 20) as f:
+        reader = csv.reader(f)
+        headers = tuple(next(reader, ()))
+        if not headers:
+            # Empty export: nothing to convert
+            return '', 0
+        width = len(headers)
+        pick = _PICKERS.get(headers)
+        if pick is None:
+            missing = [c for c in REQUIRED_EARNINGS_COLUMNS if c not in headers]
+            if missing:
+                raise ValueError(f"{csv_file.name} is missing required column(s): {', '.join(missing)}")
+            # Missing optional columns index one past the end, where an empty-string sentinel is appended
+            pick = _PICKERS[headers] = operator.itemgetter(
+                *[headers.index(c) if c in headers else width for c in EARNINGS_COLUMNS])
+        for row in reader:
+            if len(row) != width:
+                row = (row + [''] * width)[:width]
+            row.append('')
+            entries = create_journal_entry(pick(row))
+            if entries:
+                lines.extend(entries)
+                count += 1
+
+    # One string pickles back from the worker far cheaper than thousands of lines
+    return join_lines(lines), count
+
+def join_lines(lines: List[str]) -> str:
+    """Join journal lines into one newline-terminated string."""
+    return '\n'.join(lines) + '\n' if lines else ''
+
 def main():
     import_dir = Path("sakima_lc/accounting/import")
     output_file = Path("sakima_lc/accounting/journals/whatnot_earnings.journal")
 
-    # Find all earnings CSV files
-    csv_files = sorted(import_dir.glob("*_earnings.csv"))
+    # Find all earnings CSV files in a single directory pass
+    csv_files = []
+    if import_dir.is_dir():
+        with os.scandir(import_dir) as it:
+            csv_files = sorted(
+                Path(entry.path) for entry in it
+                if entry.name.endswith('_earnings.csv') and not entry.name.startswith('.') and entry.is_file()
+            )
 
     if not csv_files:
         print("No earnings CSV files found in import directory")
@@ -148,46 +269,56 @@ def main():
 
     print(f"Found {len(csv_files)} earnings files to import")
 
-    all_entries = []
+    header = []
     transaction_count = 0
 
     # Add header
-    all_entries.append("; Whatnot Earnings Import")
-    all_entries.append(f"; Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    all_entries.append(f"; Source files: {len(csv_files)}")
-    all_entries.append("")
-    all_entries.append("; Account declarations")
-    all_entries.append("account Assets:Whatnot:Pending")
-    all_entries.append("account Assets:Checking")
-    all_entries.append("account Revenue:Sales")
-    all_entries.append("account Revenue:Tips")
-    all_entries.append("account Revenue:Other")
-    all_entries.append("account Expenses:Fees")
-    all_entries.append("account Expenses:Giveaways")
-    all_entries.append("account Equity:Opening")
-    all_entries.append("")
-    all_entries.append("; Opening balance")
-    all_entries.append("2025/07/14 * Opening Balance")
-    all_entries.append("    Assets:Whatnot:Pending              $0.00")
-    all_entries.append("    Equity:Opening                      $0.00")
-    all_entries.append("")
-
-    # Process each CSV file
-    for csv_file in csv_files:
-        print(f"Processing {csv_file.name}...")
-
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                entries = create_journal_entry(row)
-                if entries:
-                    all_entries.extend(entries)
-                    transaction_count += 1
-
-    # Write journal file
+    header.append("; Whatnot Earnings Import")
+    header.append(f"; Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    header.append(f"; Source files: {len(csv_files)}")
+    header.append("")
+    header.append("; Account declarations")
+    header.append("account Assets:Whatnot:Pending")
+    header.append("account Assets:Checking")
+    header.append("account Revenue:Sales")
+    header.append("account Revenue:Tips")
+    header.append("account Revenue:Other")
+    header.append("account Expenses:Fees")
+    header.append("account Expenses:Giveaways")
+    header.append("account Equity:Opening")
+    header.append("")
+    header.append("; Opening balance")
+    header.append("2025/07/14 * Opening Balance")
+    header.append("    Assets:Whatnot:Pending              $0.00")
+    header.append("    Equity:Opening                      $0.00")
+    header.append("")
+
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(all_entries))
+    # Convert into a .tmp file and only replace the journal once every file succeeded
+    partial_file = output_file.with_name(output_file.name + '.tmp')
+    try:
+        with open(partial_file, 'w', encoding='utf-8', buffering=1 << 20) as out:
+            out.write(join_lines(header))
+
+            if len(csv_files) > 1:
+                # Files are independent, so convert them in worker processes and
+                # write the results back in file order
+                workers = min(len(csv_files), os.cpu_count() or 1)
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for csv_file, (text, count) in zip(csv_files, executor.map(convert_file, csv_files)):
+                        print(f"Processing {csv_file.name}...")
+                        out.write(text)
+                        transaction_count += count
+            else:
+                for csv_file in csv_files:
+                    print(f"Processing {csv_file.name}...")
+                    text, count = convert_file(csv_file)
+                    out.write(text)
+                    transaction_count += count
+    except BaseException:
+        partial_file.unlink(missing_ok=True)
+        raise
+    os.replace(partial_file, output_file)
 
     print(f"\nImport complete!")
     print(f"Transactions imported: {transaction_count}")
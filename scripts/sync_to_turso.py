@@ -6,14 +6,31 @@ Used by GitHub Actions and for manual backfills.
 Environment variables:
   TURSO_URL   - Turso database URL (libsql:// or https://)
   TURSO_TOKEN - Turso auth token
+  FORCE_SYNC  - set to 1 to re-sync even when a data file is unchanged since the last sync
 """
 
+import functools
+import gzip
+import hashlib
+import http.client
 import json
 import os
+import re
 import sys
-import urllib.request
-import urllib.error
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 def get_turso_url():
@@ -25,8 +42,9 @@ def get_turso_url():
     return url.replace("libsql://", "https://")
 
 
+@functools.lru_cache(maxsize=1)
 def get_turso_token():
-    """Get Turso token from env or macOS keychain."""
+    """Get Turso token from env or macOS keychain, looking it up at most once per process."""
     token = os.environ.get("TURSO_TOKEN", "")
     if token:
         return token
@@ -42,147 +60,460 @@ def get_turso_token():
         raise ValueError("TURSO_TOKEN not set and keychain lookup failed")
 
 
-def turso_execute(url, token, statements):
-    """Execute statements via Turso HTTP API v2 pipeline."""
-    endpoint = f"{url}/v2/pipeline"
-    body = {
-        "requests": [
-            {"type": "execute", "stmt": s} for s in statements
-        ] + [{"type": "close"}]
-    }
-    req = urllib.request.Request(
-        endpoint,
-        data=json.dumps(body).encode(),
-        headers={
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        },
-    )
+# Kept-alive connections by base URL, so the pipelines a thread sends share one TCP+TLS
+# handshake; http.client connections are not thread-safe, so each thread keeps its own
+_LOCAL = threading.local()
+
+
+def get_connection(url):
+    """Return this thread's kept-alive HTTP(S) connection for url, opening it on first use."""
+    connections = getattr(_LOCAL, "connections", None)
+    if connections is None:
+        connections = _LOCAL.connections = {}
+    conn = connections.get(url)
+    if conn is None:
+        parts = urlsplit(url)
+        conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        conn = conn_class(parts.netloc, timeout=60)
+        connections[url] = conn
+    return conn
+
+
+def post(url, path, data, headers):
+    """POST data on this thread's kept-alive connection; returns (status, response body)."""
+    conn = get_connection(url)
     try:
-        with urllib.request.urlopen(req) as resp:
-            return json.loads(resp.read())
-    except urllib.error.HTTPError as e:
-        print(f"HTTP {e.code}: {e.read().decode()}", file=sys.stderr)
-        raise
+        conn.request("POST", path, body=data, headers=headers)
+        resp = conn.getresponse()
+    except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+        # The server dropped the idle keep-alive connection; reconnect once and resend
+        conn.close()
+        conn.request("POST", path, body=data, headers=headers)
+        resp = conn.getresponse()
+    return resp.status, resp.read()
+
+
+# Pipeline bodies at least this large are gzipped; the repeated SQL and arg keys compress well
+GZIP_MIN_BYTES = 64 * 1024
+
+# Cleared if the server rejects a gzipped body, so later pipelines go uncompressed
+_gzip_bodies = True
+
+
+# Marks a failed statement in a pipeline response; the HTTP status is 200 either way
+_ERROR_RESULT = re.compile(rb'"type"\s*:\s*"error"')
+
+# Marks a failed step in a batch response: step_errors holds null for every step that didn't fail
+_STEP_ERROR = re.compile(rb'"step_errors"\s*:\s*\[[^\]]*\{')
+
+
+def transaction_batch(statements):
+    """Build a Hrana batch that runs statements as one transaction.
+
+    The pipeline keeps executing after a failed statement, so each step is conditioned on
+    the one before it having succeeded. The first failure skips everything after it,
+    including COMMIT, and the last step rolls the transaction back.
+    """
+    steps = [{"stmt": {"sql": "BEGIN"}}]
+    for stmt in list(statements) + [{"sql": "COMMIT"}]:
+        steps.append({"stmt": stmt, "condition": {"type": "ok", "step": len(steps) - 1}})
+    commit = len(steps) - 1
+    steps.append({
+        "stmt": {"sql": "ROLLBACK"},
+        "condition": {"type": "and", "conds": [
+            {"type": "ok", "step": 0},
+            {"type": "not", "cond": {"type": "ok", "step": commit}},
+        ]},
+    })
+    return {"steps": steps}
+
+
+def turso_execute(url, token, statements, want_results=False, transaction=()):
+    """Execute statements via Turso HTTP API v2 pipeline; returns the decoded response if asked for.
+
+    Statements in transaction run after the others, all-or-nothing (see transaction_batch).
+    """
+    endpoint = urlsplit(url).path.rstrip("/") + "/v2/pipeline"
+    requests = [{"type": "execute", "stmt": s} for s in statements]
+    if transaction:
+        requests.append({"type": "batch", "batch": transaction_batch(transaction)})
+    body = {"requests": requests + [{"type": "close"}]}
+    data = orjson.dumps(body) if orjson is not None else json.dumps(body).encode()
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    }
+    global _gzip_bodies
+    status = None
+    if _gzip_bodies and len(data) >= GZIP_MIN_BYTES:
+        compressed = gzip.compress(data, compresslevel=1)
+        status, payload = post(url, endpoint, compressed, {**headers, "Content-Encoding": "gzip"})
+        if status in (400, 415):
+            # The server refused the encoding before running anything; resend uncompressed
+            _gzip_bodies = False
+            status = None
+    if status is None:
+        status, payload = post(url, endpoint, data, headers)
+    if status != 200:
+        print(f"HTTP {status}: {payload.decode()}", file=sys.stderr)
+        raise RuntimeError(f"Turso pipeline request failed with HTTP {status}")
+    if not want_results and not _ERROR_RESULT.search(payload) and not _STEP_ERROR.search(payload):
+        # A clean response only echoes a result per statement, so skip decoding it
+        return None
+
+    result = orjson.loads(payload) if orjson is not None else json.loads(payload)
+    for entry in result.get("results", []):
+        if entry.get("type") == "error":
+            message = entry.get("error", {}).get("message", "")
+            print(f"Turso error: {message}", file=sys.stderr)
+            raise RuntimeError(f"Turso statement failed: {message}")
+        if entry.get("response", {}).get("type") == "batch":
+            for error in entry["response"]["result"].get("step_errors", []):
+                if error:
+                    message = error.get("message", "")
+                    print(f"Turso error: {message}", file=sys.stderr)
+                    raise RuntimeError(f"Turso transaction rolled back: {message}")
+    return result
+
+
+# Rows per multi-row INSERT; 500 rows stays well under SQLite's bound-parameter limit
+INSERT_CHUNK_ROWS = 500
+
+
+def append_inserts(statements, sql, row_values, rows, suffix=""):
+    """Append multi-row INSERTs of up to INSERT_CHUNK_ROWS rows to statements; returns the row count."""
+    full_sql = sql + ",".join([row_values] * INSERT_CHUNK_ROWS) + suffix
+    count = 0
+    args = []
+    for row in rows:
+        args.extend(row)
+        count += 1
+        if count % INSERT_CHUNK_ROWS == 0:
+            statements.append({"sql": full_sql, "args": args})
+            args = []
+    remainder = count % INSERT_CHUNK_ROWS
+    if remainder:
+        statements.append({"sql": sql + ",".join([row_values] * remainder) + suffix, "args": args})
+    return count
+
+
+def first_per_key(rows, key, keys):
+    """Yield only the first row for each key(row), appending every new key to keys."""
+    seen = set()
+    for row in rows:
+        row_key = key(row)
+        if row_key not in seen:
+            seen.add(row_key)
+            keys.append(row_key)
+            yield row
+
+
+# Hrana needs a type tag on every arg, so args for values that repeat across rows
+# (empty strings, platforms, prices, bid counts) are built once and shared instead
+_EMPTY_TEXT = {"type": "text", "value": ""}
+_TEXT_ARGS = {}
+_INTEGER_ARGS = {}
+_JSON_ARGS = {}
+
+
+def shared_text(value):
+    """Return the shared text arg for a value that repeats across rows."""
+    arg = _TEXT_ARGS.get(value)
+    if arg is None:
+        arg = _TEXT_ARGS[value] = {"type": "text", "value": value}
+    return arg
+
+
+def shared_integer(value):
+    """Return the shared integer arg for value, falling back to 0 when it is missing."""
+    value = str(value or 0)
+    arg = _INTEGER_ARGS.get(value)
+    if arg is None:
+        arg = _INTEGER_ARGS[value] = {"type": "integer", "value": value}
+    return arg
+
+
+def shared_json(value):
+    """Return the shared text arg for value encoded as JSON, encoding each distinct string list once."""
+    # Only lists of strings are cached: 1, True and 1.0 hash alike but encode differently
+    if not isinstance(value, list) or not all(type(v) is str for v in value):
+        return {"type": "text", "value": json.dumps(value)}
+    key = tuple(value)
+    arg = _JSON_ARGS.get(key)
+    if arg is None:
+        arg = _JSON_ARGS[key] = {"type": "text", "value": json.dumps(value)}
+    return arg
+
+
+def show_args(show):
+    """Build the INSERT args for one show."""
+    get = show.get
+    image = get("image")
+    return [
+        {"type": "text", "value": get("title", "")},
+        shared_text(get("date") or ""),
+        {"type": "text", "value": image} if image else _EMPTY_TEXT,
+        shared_integer(get("rsvp")),
+        shared_json(get("tags", [])),
+    ]
+
+
+def item_args(item):
+    """Build the INSERT args for one listing."""
+    get = item.get
+    image = get("image")
+    url = get("url")
+    return [
+        {"type": "text", "value": get("title", "")},
+        shared_text(get("price") or ""),
+        shared_text(get("binPrice") or ""),
+        shared_json(get("buyingOptions", [])),
+        shared_integer(get("bids")),
+        shared_text(get("endDate") or ""),
+        {"type": "text", "value": image} if image else _EMPTY_TEXT,
+        {"type": "text", "value": url} if url else _EMPTY_TEXT,
+        shared_text(get("platform", "eBay")),
+    ]
+
+
+# DDL per table, so a sync can create its own table in the same pipeline as its data
+SHOWS_SCHEMA = [
+    {
+        "sql": """CREATE TABLE IF NOT EXISTS sakima_shows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            date TEXT,
+            image TEXT,
+            rsvp INTEGER,
+            tags TEXT,
+            updated_at TEXT DEFAULT (datetime('now'))
+        )"""
+    },
+    {
+        "sql": """CREATE UNIQUE INDEX IF NOT EXISTS idx_sakima_shows_title_date 
+            ON sakima_shows(title, date)"""
+    },
+]
+
+ITEMS_SCHEMA = [
+    {
+        "sql": """CREATE TABLE IF NOT EXISTS sakima_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id TEXT,
+            title TEXT NOT NULL,
+            price TEXT,
+            bin_price TEXT,
+            buying_options TEXT,
+            bids INTEGER DEFAULT 0,
+            end_date TEXT,
+            image TEXT,
+            url TEXT,
+            platform TEXT DEFAULT 'eBay',
+            updated_at TEXT DEFAULT (datetime('now'))
+        )"""
+    },
+    {
+        "sql": """CREATE UNIQUE INDEX IF NOT EXISTS idx_sakima_items_url 
+            ON sakima_items(url)"""
+    },
+]
+
+# Content hash of each data file as of its last successful sync
+META_SCHEMA = [
+    {
+        "sql": """CREATE TABLE IF NOT EXISTS sakima_meta (
+            key TEXT PRIMARY KEY,
+            hash TEXT,
+            updated_at TEXT DEFAULT (datetime('now'))
+        )"""
+    },
+]
 
 
 def create_tables(url, token):
     """Create shows and items tables if they don't exist."""
-    statements = [
-        {
-            "sql": """CREATE TABLE IF NOT EXISTS sakima_shows (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                date TEXT,
-                image TEXT,
-                rsvp INTEGER,
-                tags TEXT,
-                updated_at TEXT DEFAULT (datetime('now'))
-            )"""
-        },
-        {
-            "sql": """CREATE UNIQUE INDEX IF NOT EXISTS idx_sakima_shows_title_date 
-                ON sakima_shows(title, date)"""
-        },
-        {
-            "sql": """CREATE TABLE IF NOT EXISTS sakima_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                item_id TEXT,
-                title TEXT NOT NULL,
-                price TEXT,
-                bin_price TEXT,
-                buying_options TEXT,
-                bids INTEGER DEFAULT 0,
-                end_date TEXT,
-                image TEXT,
-                url TEXT,
-                platform TEXT DEFAULT 'eBay',
-                updated_at TEXT DEFAULT (datetime('now'))
-            )"""
-        },
-        {
-            "sql": """CREATE UNIQUE INDEX IF NOT EXISTS idx_sakima_items_url 
-                ON sakima_items(url)"""
-        },
-    ]
-    result = turso_execute(url, token, statements)
+    result = turso_execute(url, token, SHOWS_SCHEMA + ITEMS_SCHEMA + META_SCHEMA)
     print("Tables created/verified.")
     return result
 
 
-def sync_shows(url, token, data_dir):
-    """Upsert shows from shows.json into Turso."""
+def content_hash(data):
+    """Return the BLAKE2b hex digest of data."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_hash(path):
+    """Return the BLAKE2b hex digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def synced_hash(url, token, key):
+    """Return the content hash recorded by the last sync of key, or None."""
+    result = turso_execute(url, token, META_SCHEMA + [{
+        "sql": "SELECT hash FROM sakima_meta WHERE key = ?",
+        "args": [{"type": "text", "value": key}],
+    }], want_results=True)
+    rows = result["results"][len(META_SCHEMA)]["response"]["result"]["rows"]
+    return rows[0][0].get("value") if rows else None
+
+
+def force_sync():
+    """Check whether FORCE_SYNC asks to re-sync unchanged data files."""
+    return os.environ.get("FORCE_SYNC", "") not in ("", "0")
+
+
+def unchanged_since_sync(url, token, key, digest):
+    """Check whether digest matches the last sync of key, unless FORCE_SYNC is set."""
+    # Always query so sakima_meta exists before this sync records its hash
+    unchanged = synced_hash(url, token, key) == digest
+    return unchanged and not force_sync()
+
+
+def record_hash(key, digest):
+    """Build the statement that records digest as the last synced hash of key."""
+    return {
+        "sql": "INSERT OR REPLACE INTO sakima_meta (key, hash, updated_at) VALUES (?, ?, datetime('now'))",
+        "args": [{"type": "text", "value": key}, {"type": "text", "value": digest}],
+    }
+
+
+def sync_shows(url, token, data_dir, schema=()):
+    """Upsert shows from shows.json into Turso, running any schema statements in the same pipeline."""
+    statements = list(schema)
     shows_file = Path(data_dir) / "shows.json"
     if not shows_file.exists():
         print("No shows.json found, skipping.")
+        if statements:
+            turso_execute(url, token, statements)
         return
 
-    with open(shows_file) as f:
-        shows = json.load(f)
-
-    if not shows:
-        statements = [{"sql": "DELETE FROM sakima_shows"}]
-        turso_execute(url, token, statements)
-        print("Cleared sakima_shows; no shows to sync.")
+    # shows.json is small, so read it once as bytes for both the hash and the parser
+    data = shows_file.read_bytes()
+    digest = content_hash(data)
+    if unchanged_since_sync(url, token, "shows", digest):
+        print("shows.json unchanged since last sync, skipping.")
         return
 
-    # Clear and re-insert (simpler than complex upsert for small dataset)
-    statements = [{"sql": "DELETE FROM sakima_shows"}]
-
-    for show in shows:
-        statements.append({
-            "sql": """INSERT INTO sakima_shows (title, date, image, rsvp, tags, updated_at)
-                VALUES (?, ?, ?, ?, ?, datetime('now'))""",
-            "args": [
-                {"type": "text", "value": show.get("title", "")},
-                {"type": "text", "value": show.get("date") or ""},
-                {"type": "text", "value": show.get("image") or ""},
-                {"type": "integer", "value": str(show.get("rsvp") or 0)},
-                {"type": "text", "value": json.dumps(show.get("tags", []))},
-            ]
-        })
+    shows = orjson.loads(data) if orjson is not None else json.loads(data)
+
+    # Upsert on the (title, date) unique index, then delete shows no longer listed, all in one
+    # transaction so readers never see an empty table. The first of any duplicates wins.
+    # The hash is recorded in the same transaction, so it only lands if every row did.
+    keys = []
+    transaction = []
+    count = append_inserts(
+        transaction,
+        "INSERT OR IGNORE INTO sakima_shows (title, date, image, rsvp, tags, updated_at) VALUES ",
+        "(?, ?, ?, ?, ?, datetime('now'))",
+        first_per_key(map(show_args, shows), lambda row: (row[0]["value"], row[1]["value"]), keys),
+        """ ON CONFLICT(title, date) DO UPDATE SET
+            image = excluded.image, rsvp = excluded.rsvp, tags = excluded.tags,
+            updated_at = excluded.updated_at""",
+    )
+    transaction += [
+        {
+            "sql": """DELETE FROM sakima_shows WHERE (title, date) NOT IN
+                (SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?))""",
+            "args": [{"type": "text", "value": json.dumps(keys)}],
+        },
+        record_hash("shows", digest),
+    ]
 
-    turso_execute(url, token, statements)
-    print(f"Synced {len(shows)} shows to Turso.")
+    turso_execute(url, token, statements, transaction=transaction)
+    if count:
+        print(f"Synced {count} shows to Turso.")
+    else:
+        print("Cleared sakima_shows; no shows to sync.")
 
 
-def sync_items(url, token, data_dir):
-    """Upsert items from listings.json into Turso."""
+def sync_items(url, token, data_dir, schema=()):
+    """Upsert items from listings.json into Turso, running any schema statements in the same pipeline."""
+    statements = list(schema)
     items_file = Path(data_dir) / "listings.json"
     if not items_file.exists():
         print("No listings.json found, skipping.")
+        if statements:
+            turso_execute(url, token, statements)
+        return
+
+    digest = file_hash(items_file)
+    if unchanged_since_sync(url, token, "items", digest):
+        print("listings.json unchanged since last sync, skipping.")
         return
 
-    with open(items_file) as f:
-        items = json.load(f)
-
-    # Clear and re-insert
-    statements = [{"sql": "DELETE FROM sakima_items"}]
-
-    for item in items:
-        statements.append({
-            "sql": """INSERT INTO sakima_items (title, price, bin_price, buying_options, bids, end_date, image, url, platform, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))""",
-            "args": [
-                {"type": "text", "value": item.get("title", "")},
-                {"type": "text", "value": item.get("price") or ""},
-                {"type": "text", "value": item.get("binPrice") or ""},
-                {"type": "text", "value": json.dumps(item.get("buyingOptions", []))},
-                {"type": "integer", "value": str(item.get("bids") or 0)},
-                {"type": "text", "value": item.get("endDate") or ""},
-                {"type": "text", "value": item.get("image") or ""},
-                {"type": "text", "value": item.get("url") or ""},
-                {"type": "text", "value": item.get("platform", "eBay")},
-            ]
-        })
-
-    turso_execute(url, token, statements)
-    print(f"Synced {len(items)} items to Turso.")
+    # Upsert on the url unique index, then delete listings no longer present, all in one
+    # transaction (hash included) so readers never see an empty table. The first of any
+    # duplicate URLs wins.
+    urls = []
+    transaction = []
+    with open(items_file, "rb") as f:
+        # With ijson, items are decoded one at a time and go straight into the INSERT chunks
+        items = ijson.items(f, "item", use_float=True) if ijson is not None else json.load(f)
+        count = append_inserts(
+            transaction,
+            "INSERT OR IGNORE INTO sakima_items (title, price, bin_price, buying_options, bids, end_date, image, url, platform, updated_at) VALUES ",
+            "(?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+            first_per_key(map(item_args, items), lambda row: row[7]["value"], urls),
+            """ ON CONFLICT(url) DO UPDATE SET
+                title = excluded.title, price = excluded.price, bin_price = excluded.bin_price,
+                buying_options = excluded.buying_options, bids = excluded.bids,
+                end_date = excluded.end_date, image = excluded.image, platform = excluded.platform,
+                updated_at = excluded.updated_at""",
+        )
+    transaction += [
+        {
+            "sql": "DELETE FROM sakima_items WHERE url NOT IN (SELECT value FROM json_each(?))",
+            "args": [{"type": "text", "value": json.dumps(urls)}],
+        },
+        record_hash("items", digest),
+    ]
+
+    turso_execute(url, token, statements, transaction=transaction)
+    print(f"Synced {count} items to Turso.")
+
+
+# Data file read by each sync, relative to the data dir
+DATA_FILES = {sync_shows: "shows.json", sync_items: "listings.json"}
+
+# Local record of each data file's (mtime_ns, size) at its last successful sync, per database
+SYNC_STATE_FILE = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "sakima" / "turso_sync.json"
+
+
+def file_stamps(paths):
+    """Return {path: [mtime_ns, size]} for those of paths that exist."""
+    stamps = {}
+    for path in paths:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        stamps[str(path)] = [st.st_mtime_ns, st.st_size]
+    return stamps
+
+
+def load_sync_state():
+    """Load the local sync state, or an empty one if it is missing or unreadable."""
+    try:
+        return json.loads(SYNC_STATE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_sync_state(state):
+    """Save the local sync state; failing to write it only costs a full check next run."""
+    try:
+        SYNC_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        SYNC_STATE_FILE.write_text(json.dumps(state))
+    except OSError:
+        pass
 
 
 def main():
     url = get_turso_url()
-    token = get_turso_token()
 
     # Default data dir: ../data relative to this script, or CWD/data
     data_dir = os.environ.get("DATA_DIR")
@@ -194,13 +525,41 @@ def main():
 
     what = sys.argv[1] if len(sys.argv) > 1 else "all"
 
-    if what in ("all", "init"):
-        create_tables(url, token)
+    syncs = []
     if what in ("all", "shows"):
-        sync_shows(url, token, data_dir)
+        syncs.append(sync_shows)
     if what in ("all", "items", "listings"):
-        sync_items(url, token, data_dir)
+        syncs.append(sync_items)
+
+    # Stop before the token lookup and any network call when every data file still has the
+    # mtime and size it had when it was last synced to this database from this machine
+    stamps = file_stamps(Path(data_dir) / DATA_FILES[sync] for sync in syncs)
+    state = load_sync_state()
+    synced = state.get(url, {})
+    if stamps and not force_sync() and all(synced.get(path) == stamp for path, stamp in stamps.items()):
+        print("No changes since last sync.")
+        return
+
+    token = get_turso_token()
+    if what == "init":
+        create_tables(url, token)
 
+    # Each sync sends its table's DDL in the same pipeline as its data rather than a round-trip
+    # of its own, so a single-table sync also works against a database that was never initialised
+    schemas = {sync_shows: SHOWS_SCHEMA, sync_items: ITEMS_SCHEMA}
+
+    # The tables are independent, so overlap their round-trips: the first sync runs on
+    # the main thread while the rest run on worker threads
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(sync, url, token, data_dir, schemas.get(sync, ())) for sync in syncs[1:]]
+        for sync in syncs[:1]:
+            sync(url, token, data_dir, schemas.get(sync, ()))
+        for future in futures:
+            future.result()
+
+    if stamps:
+        state[url] = {**synced, **stamps}
+        save_sync_state(state)
     print("Done.")
 
 